@@ -11,7 +11,7 @@ from torchvision import transforms
 from PIL import Image, ImageDraw, ImageFont
 
 import rl.ppo.ppo_trainer as ppo_trainer
-from rl.common.utils import logger
+from rl.common.utils import logger, split_step_outputs
 from rl.common.env_utils import construct_envs, get_env_class
 from .utils import util
 import os
@@ -60,6 +60,7 @@ class VizTrainer(ppo_trainer.PPOTrainer):
         draw.text((10, 0), text, fill='white', font=self.font)
 
     # [!!] Clone of eval, except don't update the optimizer, and visualize frames + actions
+    @torch.inference_mode()
     def enjoy(self):
 
         self.init_viz()
@@ -170,39 +171,31 @@ class VizTrainer(ppo_trainer.PPOTrainer):
 
                 current_episodes = self.envs.current_episodes()
 
-                with torch.no_grad():
-                    (
-                        _,
-                        actions,
-                        _,
-                        test_recurrent_hidden_states,
-                    ) = self.actor_critic.act(
-                        batch,
-                        test_recurrent_hidden_states,
-                        prev_actions,
-                        not_done_masks,
-                        deterministic=False,
-                    )
-
-                    prev_actions.copy_(actions)
-
-                outputs = self.envs.step([a[0].item() for a in actions])
-
-                observations, rewards, dones, infos = [
-                    list(x) for x in zip(*outputs)
-                ]
-                batch = self.batch_obs(observations, self.device)
+                (
+                    _,
+                    actions,
+                    _,
+                    test_recurrent_hidden_states,
+                ) = self.actor_critic.act(
+                    batch,
+                    test_recurrent_hidden_states,
+                    prev_actions,
+                    not_done_masks,
+                    deterministic=False,
+                )
+
+                prev_actions.copy_(actions)
 
-                not_done_masks = torch.tensor(
-                    [[0.0] if done else [1.0] for done in dones],
-                    dtype=torch.float,
-                    device=self.device,
+                outputs = self.envs.step(actions.view(-1).tolist())
+
+                observations, rewards, dones, infos = split_step_outputs(
+                    outputs
                 )
+                batch = self.batch_obs(observations, self.device)
+
+                not_done_masks = self._eval_not_done_masks(dones)
 
-                rewards = torch.tensor(
-                    rewards, dtype=torch.float, device=self.device
-                ).unsqueeze(1)
-                current_episode_reward += rewards
+                current_episode_reward.add_(self._eval_rewards_tensor(rewards))
                 n_envs = self.envs.num_envs
                 for i in range(n_envs):
                     # episode ended
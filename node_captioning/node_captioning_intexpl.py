@@ -41,6 +41,9 @@ sys.path.append(LLAMA_PATH)
 
 from llama import Llama, Dialog
 
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from rollouts import load_rollout
+
 
 
 # #############
@@ -62,8 +65,7 @@ console.print("[bold red]User:[/bold red] " + query)
 
 file_path = 'FloorPlan1_9685294.pkl'
 
-with open(file_path, 'rb') as f:
-    data = pickle.load(f)
+data = load_rollout(file_path)
 
 file_path = 'refined_pick_captions.pkl'
 
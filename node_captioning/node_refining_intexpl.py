@@ -175,5 +175,6 @@ print(responses)
 file_path = "refined_pick_captions.pkl"
 
 # Open the file in binary write mode
+# serialize in memory first so the file sees one large write
 with open(file_path, 'wb') as f:
-    pickle.dump(responses, f)
\ No newline at end of file
+    f.write(pickle.dumps(responses, protocol=pickle.HIGHEST_PROTOCOL))
\ No newline at end of file
@@ -158,7 +158,9 @@ class BaseRLTrainer(BaseTrainer):
             for k, v in batch.items():
                 batch[k] = v[state_index]
 
-            rgb_frames = [rgb_frames[i] for i in state_index]
+            # frame buffering is optional (EVAL.SAVE_VIDEO)
+            if rgb_frames is not None:
+                rgb_frames = [rgb_frames[i] for i in state_index]
 
         return (
             envs,
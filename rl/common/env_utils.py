@@ -110,6 +110,7 @@ def construct_envs(config, env_class):
             tuple(zip(configs, env_classes, ranks))
         ),
     )
+
     return envs
 
 # [!!] Habitat specific
@@ -11,6 +11,39 @@ from collections import defaultdict
 import torch
 
 
+@torch.jit.script
+def _compute_returns(
+    rewards: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    returns: torch.Tensor,
+    next_value: torch.Tensor,
+    num_valid_steps: int,
+    use_gae: bool,
+    gamma: float,
+    tau: float,
+):
+    # scripted so the time loop runs without the Python interpreter and the
+    # per-step arithmetic is fused into a few kernels (see compute_returns)
+    if use_gae:
+        value_preds[num_valid_steps] = next_value
+        gae = torch.zeros_like(next_value)
+        for step in range(num_valid_steps - 1, -1, -1):
+            delta = (
+                rewards[step]
+                + gamma * value_preds[step + 1] * masks[step + 1]
+                - value_preds[step]
+            )
+            gae = delta + gamma * tau * masks[step + 1] * gae
+            returns[step] = gae + value_preds[step]
+    else:
+        returns[num_valid_steps] = next_value
+        for step in range(num_valid_steps - 1, -1, -1):
+            returns[step] = (
+                returns[step + 1] * gamma * masks[step + 1] + rewards[step]
+            )
+
+
 class RolloutStorage:
     r"""Class for storing rollout information for RL trainers.
 
@@ -62,9 +95,24 @@ class RolloutStorage:
         self.num_steps = num_steps
         self.step = 0
 
+        # lazily-built {sensor: observations[sensor][step]} dicts, reused
+        # across rollout steps (see get_step_observation)
+        self._step_observation_cache = [None] * (num_steps + 1)
+
+    def get_step_observation(self, step):
+        r"""Dict of per-sensor observation views for ``step``. The views are
+        cached so the dict is not rebuilt on every call.
+        """
+        cached = self._step_observation_cache[step]
+        if cached is None:
+            cached = {k: v[step] for k, v in self.observations.items()}
+            self._step_observation_cache[step] = cached
+        return cached
+
     def to(self, device):
         for sensor in self.observations:
             self.observations[sensor] = self.observations[sensor].to(device)
+        self._step_observation_cache = [None] * (self.num_steps + 1)
 
         self.recurrent_hidden_states = self.recurrent_hidden_states.to(device)
         self.rewards = self.rewards.to(device)
@@ -115,24 +163,17 @@ class RolloutStorage:
         self.step = 0
 
     def compute_returns(self, next_value, use_gae, gamma, tau):
-        if use_gae:
-            self.value_preds[self.step] = next_value
-            gae = 0
-            for step in reversed(range(self.step)):
-                delta = (
-                    self.rewards[step]
-                    + gamma * self.value_preds[step + 1] * self.masks[step + 1]
-                    - self.value_preds[step]
-                )
-                gae = delta + gamma * tau * self.masks[step + 1] * gae
-                self.returns[step] = gae + self.value_preds[step]
-        else:
-            self.returns[self.step] = next_value
-            for step in reversed(range(self.step)):
-                self.returns[step] = (
-                    self.returns[step + 1] * gamma * self.masks[step + 1]
-                    + self.rewards[step]
-                )
+        _compute_returns(
+            self.rewards,
+            self.value_preds,
+            self.masks,
+            self.returns,
+            next_value,
+            self.step,
+            use_gae,
+            gamma,
+            tau,
+        )
 
     def recurrent_generator(self, advantages, num_mini_batch):
         num_processes = self.rewards.size(1)
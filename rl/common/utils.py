@@ -82,6 +82,40 @@ class TensorboardWriter:
             self.writer.close()
 
 
+class TensorWindow:
+    r"""Bounded window of same-shape tensors backed by one preallocated ring
+    buffer. Drop-in for a deque of per-update clones: supports append, len
+    and integer indexing (oldest at 0, newest at -1) without allocating on
+    every append.
+
+    Args:
+        maxlen: maximum number of entries kept in the window.
+    """
+
+    def __init__(self, maxlen: int):
+        self._maxlen = maxlen
+        self._buffer: Optional[torch.Tensor] = None
+        self._head = 0  # slot for the next write
+        self._len = 0
+
+    def append(self, value: torch.Tensor) -> None:
+        if self._buffer is None:
+            self._buffer = value.new_zeros((self._maxlen, *value.shape))
+        self._buffer[self._head].copy_(value)
+        self._head = (self._head + 1) % self._maxlen
+        self._len = min(self._len + 1, self._maxlen)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, index: int) -> torch.Tensor:
+        if not -self._len <= index < self._len:
+            raise IndexError("TensorWindow index out of range")
+        index = index % self._len
+        oldest = (self._head - self._len) % self._maxlen
+        return self._buffer[(oldest + index) % self._maxlen]
+
+
 def linear_decay(epoch: int, total_num_updates: int) -> float:
     r"""Returns a multiplicative factor for linear value decay
 
@@ -104,6 +138,101 @@ def _to_tensor(v) -> torch.Tensor:
         return torch.tensor(v, dtype=torch.float)
 
 
+# batched numpy staging buffers for batch_obs, keyed by sensor name. Envs
+# return dicts of fixed-shape numpy arrays, so each sensor batch can be
+# assembled with numpy memcopies into one reusable (num_envs, *shape) array
+# and wrapped with a single torch.from_numpy instead of creating and
+# stacking num_envs tensors per sensor per step.
+_numpy_batch_buffers: Dict[str, np.ndarray] = {}
+
+
+def _stack_into_buffer(sensor: str, arrays: List[np.ndarray]) -> torch.Tensor:
+    buf = _numpy_batch_buffers.get(sensor)
+    shape = (len(arrays),) + arrays[0].shape
+    if buf is None or buf.shape != shape or buf.dtype != arrays[0].dtype:
+        buf = np.empty(shape, dtype=arrays[0].dtype)
+        _numpy_batch_buffers[sensor] = buf
+    for i, arr in enumerate(arrays):
+        buf[i] = arr
+    return torch.from_numpy(buf)
+
+
+def split_step_outputs(outputs):
+    r"""Split the (obs, reward, done, info) tuples from VectorEnv.step into
+    structure-of-arrays form in a single pass, instead of walking the
+    outputs four times through a star-zip transpose.
+
+    Args:
+        outputs: list of per-env (obs, reward, done, info) tuples.
+
+    Returns:
+        (observations, rewards, dones, infos) where dones is a bool array
+        so downstream consumers share one conversion.
+    """
+    observations = []
+    rewards = []
+    infos = []
+    dones = np.empty(len(outputs), dtype=np.bool_)
+    for i, (obs, reward, done, info) in enumerate(outputs):
+        observations.append(obs)
+        rewards.append(reward)
+        dones[i] = done
+        infos.append(info)
+    return observations, rewards, dones, infos
+
+
+def stack_observations(
+    observations: List[Dict],
+) -> Dict[str, torch.Tensor]:
+    r"""Transpose a list of per-env observation dicts into a dict of batched
+    CPU tensors. Numpy sensors are memcopied into one reusable
+    (num_envs, *shape) staging array and wrapped with a single
+    torch.from_numpy, instead of creating and stacking num_envs tensors per
+    sensor per step.
+
+    Args:
+        observations: list of dicts of observations.
+
+    Returns:
+        dict of (num_envs, *shape) CPU tensors, one per sensor.
+    """
+    batch = defaultdict(list)
+    for obs in observations:
+        for sensor in obs:
+            batch[sensor].append(obs[sensor])
+
+    stacked = {}
+    for sensor, values in batch.items():
+        if isinstance(values[0], np.ndarray):
+            stacked[sensor] = _stack_into_buffer(sensor, values)
+        else:
+            stacked[sensor] = torch.stack(
+                [_to_tensor(v) for v in values], dim=0
+            )
+    return stacked
+
+
+# pinned host staging buffers for batch_obs, keyed by sensor name and
+# reused across steps (observation shapes are fixed per run)
+_pinned_buffers: Dict[str, torch.Tensor] = {}
+
+# persistent float destination tensors on the compute device, so the H2D
+# copy and the uint8->float conversion happen in one copy_ into reused
+# memory instead of allocating a fresh device tensor every step. Callers
+# of batch_obs must treat the returned batch as valid only until the next
+# call (every consumer in the tree copies or consumes it within the step).
+_device_buffers: Dict[str, torch.Tensor] = {}
+
+
+def _pin_for_transfer(sensor: str, tensor: torch.Tensor) -> torch.Tensor:
+    buf = _pinned_buffers.get(sensor)
+    if buf is None or buf.shape != tensor.shape or buf.dtype != tensor.dtype:
+        buf = torch.empty_like(tensor).pin_memory()
+        _pinned_buffers[sensor] = buf
+    buf.copy_(tensor)
+    return buf
+
+
 def batch_obs(
     observations: List[Dict], device: Optional[torch.device] = None
 ) -> Dict[str, torch.Tensor]:
@@ -118,17 +247,25 @@ def batch_obs(
     Returns:
         transposed dict of lists of observations.
     """
-    batch = defaultdict(list)
+    batch = stack_observations(observations)
 
-    for obs in observations:
-        for sensor in obs:
-            batch[sensor].append(_to_tensor(obs[sensor]))
-            
-    for sensor in batch:
-        batch[sensor] = (
-            torch.stack(batch[sensor], dim=0)
-            .to(device=device)
-            .to(dtype=torch.float)
-        )
+    use_pinned = device is not None and torch.device(device).type == "cuda"
+    for sensor, stacked in batch.items():
+        if use_pinned:
+            # stage through a reusable pinned buffer so the H2D copy is
+            # asynchronous, and land it in a persistent float tensor on the
+            # device: transfer and dtype conversion fuse into one copy_
+            # with no per-step device allocation
+            pinned = _pin_for_transfer(sensor, stacked)
+            dst = _device_buffers.get(sensor)
+            if dst is None or dst.shape != stacked.shape:
+                dst = torch.empty(
+                    stacked.shape, dtype=torch.float, device=device
+                )
+                _device_buffers[sensor] = dst
+            dst.copy_(pinned, non_blocking=True)
+            batch[sensor] = dst
+        else:
+            batch[sensor] = stacked.to(device=device).to(dtype=torch.float)
 
     return batch
\ No newline at end of file
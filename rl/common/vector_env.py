@@ -47,6 +47,7 @@ ACTION_SPACE_COMMAND = "action_space"
 CALL_COMMAND = "call"
 EPISODE_COMMAND = "current_episode"
 ACT_COMMAND = "act"
+ACT_SEQUENCE_COMMAND = "act_sequence"
 
 # # [!!] moved to env_utils
 # def _make_env_fn(
@@ -207,6 +208,12 @@ class VectorEnv:
                     # print("lauda")
                     connection_write_fn(observations)
 
+                elif command == ACT_SEQUENCE_COMMAND:
+                    # run a scripted action sequence worker-side so the
+                    # caller pays one command round-trip instead of one
+                    # per action
+                    connection_write_fn([env.act(action) for action in data])
+
                 elif command == RENDER_COMMAND:
                     connection_write_fn(env.render(*data[0], **data[1]))
 
@@ -353,6 +360,53 @@ class VectorEnv:
         return info
 
 
+    def act_sequence(self, actions: List[str]):
+        r"""Execute a scripted sequence of :ref:`act` calls in every env with
+        a single command round-trip instead of one per action.
+
+        :param actions: action names, executed in order by each env.
+        :return: list with one info dict per action (from the last env read,
+            matching the :ref:`act` convention).
+        """
+        self._is_waiting = True
+        for write_fn in self._connection_write_fns:
+            write_fn((ACT_SEQUENCE_COMMAND, list(actions)))
+        infos = []
+        for read_fn in self._connection_read_fns:
+            infos = read_fn()
+        self._is_waiting = False
+        return infos
+
+    def act_at(self, index_env: int, action):
+        r"""Execute :ref:`act` in the index_env environment only, leaving the
+        other envs untouched.
+
+        :param index_env: index of the environment to act in.
+        :param action: action name passed to the env's act method.
+        :return: info dict from the indexed env.
+        """
+        self._is_waiting = True
+        self._connection_write_fns[index_env]((ACT_COMMAND, action))
+        info = self._connection_read_fns[index_env]()
+        self._is_waiting = False
+        return info
+
+    def act_sequence_at(self, index_env: int, actions: List[str]):
+        r"""Execute a scripted sequence of :ref:`act` calls in the index_env
+        environment only, with a single command round-trip.
+
+        :param index_env: index of the environment to act in.
+        :param actions: action names, executed in order.
+        :return: list with one info dict per action.
+        """
+        self._is_waiting = True
+        self._connection_write_fns[index_env](
+            (ACT_SEQUENCE_COMMAND, list(actions))
+        )
+        infos = self._connection_read_fns[index_env]()
+        self._is_waiting = False
+        return infos
+
     def reset_at(self, index_env: int):
         r"""Reset in the index_env environment in the vector.
 
@@ -402,6 +456,18 @@ class VectorEnv:
         self._is_waiting = False
         return observations
 
+    def step_async(self, data: List[Union[int, str, Dict[str, Any]]]) -> None:
+        r"""Alias for :ref:`async_step` matching the gym ``AsyncVectorEnv``
+        naming, so trainers can split dispatch and collection explicitly.
+        """
+        self.async_step(data)
+
+    def step_wait(self):
+        r"""Alias for :ref:`wait_step` matching the gym ``AsyncVectorEnv``
+        naming.
+        """
+        return self.wait_step()
+
     def step(self, data: List[Union[int, str, Dict[str, Any]]]) -> List[Any]:
         r"""Perform actions in the vectorized environments.
 
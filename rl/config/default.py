@@ -71,6 +71,8 @@ _C.OUT_DIR = "" # Where to store affordance data?
 # -----------------------------------------------------------------------------
 _C.EVAL = CN()
 _C.EVAL.DATASET = 'interaction_exploration/data/test_episodes_K_16.json'
+_C.EVAL.SAVE_VIDEO = False # buffer per-step RGB frames during eval
+_C.EVAL.ROLLOUT_FLUSH_EVERY = 0 # flush rollout frames to disk in _partN.pkl chunks of this many entries (0 = single file)
 
 # -----------------------------------------------------------------------------
 # MODEL
@@ -119,6 +121,7 @@ _C.RL.PPO.use_normalized_advantage = False
 _C.RL.PPO.gae_lambda = 0.95
 _C.RL.PPO.hidden_size = 512
 _C.RL.PPO.policy_wts = ""
+_C.RL.PPO.compile_policy = False # torch.compile the policy net (torch >= 2.2)
 
 # -----------------------------------------------------------------------------
 
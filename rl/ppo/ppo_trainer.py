@@ -6,9 +6,11 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import logging
 import os
 import time
-from collections import defaultdict, deque
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 import tqdm
 import numpy as np
@@ -34,7 +36,13 @@ import random
 # )
 # from habitat_baselines.rl.ppo import PPO, PointNavBaselinePolicy
 from .ppo import PPO
-from ..common.utils import linear_decay, logger, TensorboardWriter
+from ..common.utils import (
+    linear_decay,
+    logger,
+    split_step_outputs,
+    TensorboardWriter,
+    TensorWindow,
+)
 from ..common.rollout_storage import RolloutStorage
 from ..common.env_utils import construct_envs, get_env_class
 from ..common.base_trainer import BaseRLTrainer
@@ -47,6 +55,64 @@ E2E = E2E.lower() == 'true'
 OBCOV = OBCOV.lower() == 'true'
 HYBRID = HYBRID.lower() == 'true'
 
+# action vocabularies used by the eval loops, hoisted to module scope so the
+# per-step loops do not rebuild the dicts on every iteration
+ACT_TO_IDX = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'open': 5, 'close': 6}
+E2E_ACT_TO_IDX = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'take': 5, 'put': 6, 'open': 7, 'close': 8}
+
+# precomputed inverses so the reward-check paths resolve an action index
+# with a single tuple lookup instead of inverting a dict per call
+IDX_TO_ACT = tuple(sorted(ACT_TO_IDX, key=ACT_TO_IDX.get))
+E2E_IDX_TO_ACT = tuple(sorted(E2E_ACT_TO_IDX, key=E2E_ACT_TO_IDX.get))
+
+# the actions the no_action sweep records
+_OPEN_CLOSE = frozenset({"open", "close"})
+
+# scripted probe sequences, built once instead of per trigger; each runs
+# worker-side through act_sequence_at in a single command round-trip
+HYBRID_PROBE_SEQ = ("take", "put", "close")
+OBCOV_PROBE_SEQ = ("open", "take", "put", "close")
+NO_ACTION_PROBE_SEQ = (
+    "take", "put",
+    "up", "take", "put",
+    "down", "down", "take", "put",
+    "up", "tleft", "take", "put",
+    "tright", "tright", "down", "take", "put",
+    "up", "tleft", "close",
+)
+# positions of the take/put results within NO_ACTION_PROBE_SEQ
+_NO_ACTION_TAKE_PUT_IDX = (0, 1, 3, 4, 7, 8, 11, 12, 16, 17)
+
+
+def _rollout_frame(obs):
+    r"""Contiguous uint8 RGB frame for the rollout pickle. Accepts either a
+    full observation dict or a raw frame array; storing just the uint8 frame
+    keeps the per-episode pickle several times smaller than stashing whole
+    observation dicts (which drag the aux masks along).
+    """
+    if obs is None:
+        return None
+    if isinstance(obs, dict):
+        obs = obs['rgb']
+    return np.ascontiguousarray(obs, dtype=np.uint8)
+
+
+@torch.jit.script
+def _update_reward_stats(
+    current_episode_reward: torch.Tensor,
+    rewards: torch.Tensor,
+    masks: torch.Tensor,
+    reward_sum: torch.Tensor,
+    count: torch.Tensor,
+) -> None:
+    """Fused per-step episode-reward/count update (single scripted call
+    instead of four separate small-tensor kernels)."""
+    current_episode_reward.add_(rewards)
+    not_done = 1.0 - masks
+    reward_sum.add_(not_done * current_episode_reward)
+    count.add_(not_done)
+    current_episode_reward.mul_(masks)
+
 
 # @baseline_registry.register_trainer(name="ppo") # [!!]
 class PPOTrainer(BaseRLTrainer):
@@ -66,6 +132,42 @@ class PPOTrainer(BaseRLTrainer):
         self._static_encoder = False
         self._encoder = None
 
+        # policy outputs for an env step that has been dispatched with
+        # step_async but not collected yet (see _collect_rollout_step)
+        self._pending_policy_outputs = None
+
+        # background checkpoint writer (see save_checkpoint)
+        self._checkpoint_executor = None
+        self._checkpoint_future = None
+
+        # background rollout-pickle writer (see _dump_rollout_async)
+        self._rollout_dump_executor = None
+        self._rollout_dump_future = None
+
+        # reusable per-step scalar buffers and reward/mask tensors,
+        # allocated once we know num_envs
+        self._reward_buffer = None
+        self._done_buffer = None
+        self._mask_buffer = None
+        self._rewards_t = None
+        self._masks_t = None
+
+        # stacked (K, num_envs, 1) tensor backing the per-key info entries of
+        # running_episode_stats (see _rebuild_info_stats)
+        self._info_stats_base = None
+        self._info_stats_keys = None
+
+        # reusable CPU staging for the eval-loop done->mask conversion
+        # (see _eval_not_done_masks)
+        self._eval_done_buffer = None
+        self._eval_mask_buffer = None
+        self._eval_mask_pinned = None
+
+        # reusable CPU staging for the eval-loop reward tensor
+        # (see _eval_rewards_tensor)
+        self._eval_reward_buffer = None
+        self._eval_reward_pinned = None
+
     # Create the actor critic model (habitat initializes a PointNavBaselinePolicy)
     def _init_actor_critic_model(self, ppo_cfg):
         raise NotImplementedError
@@ -90,6 +192,21 @@ class PPOTrainer(BaseRLTrainer):
         self.actor_critic = self._init_actor_critic_model(ppo_cfg)
         self.actor_critic.to(self.device)
 
+        # batch shapes are fixed for a whole run, so let cuDNN autotune its
+        # kernels once and replay the winners on every step
+        if torch.cuda.is_available() and not self.config.CUDA_DETERMINISTIC:
+            torch.backends.cudnn.benchmark = True
+
+        # both .act and .get_value funnel through the policy net, so
+        # compiling it in place covers the hot paths without touching the
+        # checkpoint state_dict keys (Module.compile needs torch >= 2.2)
+        if getattr(ppo_cfg, 'compile_policy', False):
+            if hasattr(self.actor_critic.net, 'compile'):
+                self.actor_critic.net.compile()
+                logger.info('Compiled policy net with torch.compile')
+            else:
+                logger.info('compile_policy set but torch.compile unavailable')
+
         self.agent = PPO(
             actor_critic=self.actor_critic,
             clip_param=ppo_cfg.clip_param,
@@ -106,7 +223,9 @@ class PPOTrainer(BaseRLTrainer):
     def save_checkpoint(
         self, file_name: str, extra_state: Optional[Dict] = None
     ) -> None:
-        r"""Save checkpoint with specified name.
+        r"""Save checkpoint with specified name. The state dict is snapshot
+        to host memory synchronously (cheap) and serialized to disk on a
+        background thread so training is not stalled by the write.
 
         Args:
             file_name: file name for checkpoint
@@ -114,17 +233,67 @@ class PPOTrainer(BaseRLTrainer):
         Returns:
             None
         """
+        # copy=True also snapshots CPU-resident weights, so the optimizer
+        # can keep mutating them while the background write runs
         checkpoint = {
-            "state_dict": self.agent.state_dict(),
+            "state_dict": {
+                k: v.detach().to("cpu", copy=True)
+                for k, v in self.agent.state_dict().items()
+            },
             "config": self.config,
         }
         if extra_state is not None:
             checkpoint["extra_state"] = extra_state
 
-        torch.save(
-            checkpoint, os.path.join(self.config.CHECKPOINT_FOLDER, file_name)
+        if self._checkpoint_executor is None:
+            self._checkpoint_executor = ThreadPoolExecutor(max_workers=1)
+        # never queue more than one pending write (and surface any error
+        # from the previous one)
+        if self._checkpoint_future is not None:
+            self._checkpoint_future.result()
+        self._checkpoint_future = self._checkpoint_executor.submit(
+            torch.save,
+            checkpoint,
+            os.path.join(self.config.CHECKPOINT_FOLDER, file_name),
         )
 
+    @staticmethod
+    def _dump_rollout(filename, data_to_save):
+        # stream straight into a 1 MiB-buffered file: protocol 5 emits the
+        # frame arrays from their own memory, so peak RAM stays at one copy
+        # of the episode instead of doubling through an in-memory blob,
+        # while the buffer keeps the syscall count low
+        with open(filename, 'wb', buffering=1024 * 1024) as f:
+            pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(
+                data_to_save
+            )
+
+    def _dump_rollout_async(self, filename, data_to_save) -> None:
+        r"""Serialize a rollout dict to disk on a background thread so the
+        next episode's first env step is not blocked behind pickling the
+        frame pairs. Callers must hand over ownership of data_to_save
+        (rebind fresh lists rather than clearing them in place).
+
+        Args:
+            filename: destination .pkl path
+            data_to_save: rollout dict to pickle
+        """
+        if self._rollout_dump_executor is None:
+            self._rollout_dump_executor = ThreadPoolExecutor(max_workers=1)
+        # never queue more than one pending write (and surface any error
+        # from the previous one)
+        if self._rollout_dump_future is not None:
+            self._rollout_dump_future.result()
+        self._rollout_dump_future = self._rollout_dump_executor.submit(
+            self._dump_rollout, filename, data_to_save
+        )
+
+    def _drain_rollout_dumps(self) -> None:
+        r"""Wait for the last queued rollout write before shutdown."""
+        if self._rollout_dump_future is not None:
+            self._rollout_dump_future.result()
+            self._rollout_dump_future = None
+
     def load_checkpoint(self, checkpoint_path: str, *args, **kwargs) -> Dict:
         r"""Load checkpoint of specified path as a dict.
 
@@ -166,15 +335,45 @@ class PPOTrainer(BaseRLTrainer):
 
         return result
 
+    # cached flattened-key schema for _extract_scalars_from_infos. The info
+    # dicts have a fixed layout per env, so the recursive walk with its
+    # isinstance/np.size checks only needs to run once; later calls read the
+    # cached key paths directly.
+    _info_scalar_schema = None
+
+    @classmethod
+    def _build_info_scalar_schema(cls, info):
+        return [
+            (flat_key, tuple(flat_key.split(".")))
+            for flat_key in cls._extract_scalars_from_info(info)
+        ]
+
     @classmethod
     def _extract_scalars_from_infos(
         cls, infos: List[Dict[str, Any]]
     ) -> Dict[str, List[float]]:
 
         results = defaultdict(list)
-        for i in range(len(infos)):
-            for k, v in cls._extract_scalars_from_info(infos[i]).items():
-                results[k].append(v)
+        if len(infos) == 0:
+            return results
+
+        if cls._info_scalar_schema is None:
+            cls._info_scalar_schema = cls._build_info_scalar_schema(infos[0])
+
+        try:
+            for info in infos:
+                for flat_key, path in cls._info_scalar_schema:
+                    v = info
+                    for k in path:
+                        v = v[k]
+                    results[flat_key].append(float(v))
+        except (KeyError, TypeError, ValueError):
+            # schema changed under us: drop the cache and take the slow path
+            cls._info_scalar_schema = None
+            results = defaultdict(list)
+            for i in range(len(infos)):
+                for k, v in cls._extract_scalars_from_info(infos[i]).items():
+                    results[k].append(v)
 
         return results
 
@@ -182,76 +381,166 @@ class PPOTrainer(BaseRLTrainer):
     def batch_obs(self, observations, device=None):
         raise NotImplementedError
 
+    def _eval_not_done_masks(self, dones):
+        r"""Not-done mask tensor for an eval step, built through reusable CPU
+        buffers instead of a fresh list comprehension + torch.tensor call on
+        every iteration.
+        """
+        n = len(dones)
+        if self._eval_done_buffer is None or self._eval_done_buffer.shape[0] < n:
+            self._eval_done_buffer = np.empty(n, dtype=np.float32)
+            self._eval_mask_buffer = np.empty(n, dtype=np.float32)
+        if isinstance(dones, np.ndarray):
+            # already converted by split_step_outputs; subtract straight
+            # from it without the staging copy
+            done_arr = dones
+        else:
+            self._eval_done_buffer[:n] = dones
+            done_arr = self._eval_done_buffer[:n]
+        np.subtract(1.0, done_arr, out=self._eval_mask_buffer[:n])
+        masks = torch.from_numpy(self._eval_mask_buffer[:n]).unsqueeze(1)
+        if self.device.type == "cuda":
+            # stage through a reusable pinned buffer so the H2D copy is
+            # asynchronous (mirrors batch_obs, see rl/common/utils.py)
+            if (
+                self._eval_mask_pinned is None
+                or self._eval_mask_pinned.shape[0] < n
+            ):
+                self._eval_mask_pinned = torch.empty(
+                    n, 1, dtype=torch.float
+                ).pin_memory()
+            pinned = self._eval_mask_pinned[:n]
+            pinned.copy_(masks)
+            return pinned.to(device=self.device, non_blocking=True)
+        return masks.to(device=self.device, copy=True)
+
+    def _eval_rewards_tensor(self, rewards):
+        r"""(num_envs, 1) reward tensor for an eval step, staged through the
+        same reusable (and, on CUDA, pinned) buffers as the masks instead of
+        allocating a fresh device tensor from a Python list every step.
+        """
+        n = len(rewards)
+        if (
+            self._eval_reward_buffer is None
+            or self._eval_reward_buffer.shape[0] < n
+        ):
+            self._eval_reward_buffer = np.empty(n, dtype=np.float32)
+        self._eval_reward_buffer[:n] = rewards
+        staged = torch.from_numpy(self._eval_reward_buffer[:n]).unsqueeze(1)
+        if self.device.type == "cuda":
+            if (
+                self._eval_reward_pinned is None
+                or self._eval_reward_pinned.shape[0] < n
+            ):
+                self._eval_reward_pinned = torch.empty(
+                    n, 1, dtype=torch.float
+                ).pin_memory()
+            pinned = self._eval_reward_pinned[:n]
+            pinned.copy_(staged)
+            return pinned.to(device=self.device, non_blocking=True)
+        return staged.to(device=self.device, copy=True)
+
+
+    def _rebuild_info_stats(self, keys, running_episode_stats):
+        r"""(Re)build the stacked tensor backing the per-key info stats and
+        register per-key views into running_episode_stats, so readers keep
+        seeing ordinary (num_envs, 1) tensors while updates happen in one op.
+        """
+        count = running_episode_stats["count"]
+        base = torch.zeros(len(keys), *count.shape, device=count.device)
+        for i, k in enumerate(keys):
+            if k in running_episode_stats:
+                base[i].copy_(running_episode_stats[k])
+            running_episode_stats[k] = base[i]
+        self._info_stats_base = base
+        self._info_stats_keys = keys
+
+    def _sample_actions_and_step_async(self, rollouts):
+        r"""Sample actions for the current rollout step and dispatch them to
+        the envs without waiting for the result. The policy outputs are
+        stashed until the matching step_wait in _collect_rollout_step.
 
-    def _collect_rollout_step(
-        self, rollouts, current_episode_reward, running_episode_stats
-    ):
-        pth_time = 0.0
-        env_time = 0.0
-
+        Returns:
+            time spent in the policy forward
+        """
         t_sample_action = time.time()
-        # sample actions
-        with torch.no_grad():
-            step_observation = {
-                k: v[rollouts.step] for k, v in rollouts.observations.items()
-            }
+        # sample actions (inference_mode skips the autograd bookkeeping that
+        # no_grad still pays; the outputs are only ever copied into storage)
+        with torch.inference_mode():
+            step_observation = rollouts.get_step_observation(rollouts.step)
 
-            (
-                values,
-                actions,
-                actions_log_probs,
-                recurrent_hidden_states,
-            ) = self.actor_critic.act(
+            self._pending_policy_outputs = self.actor_critic.act(
                 step_observation,
                 rollouts.recurrent_hidden_states[rollouts.step],
                 rollouts.prev_actions[rollouts.step],
                 rollouts.masks[rollouts.step],
             )
 
-        pth_time += time.time() - t_sample_action
+        # one batched D2H transfer instead of a per-env .item() sync
+        actions = self._pending_policy_outputs[1]
+        self.envs.step_async(actions.squeeze(-1).cpu().tolist())
+
+        return time.time() - t_sample_action
+
+    def _collect_rollout_step(
+        self, rollouts, current_episode_reward, running_episode_stats
+    ):
+        pth_time = 0.0
+        env_time = 0.0
+
+        # first step of an update: nothing dispatched yet
+        if self._pending_policy_outputs is None:
+            pth_time += self._sample_actions_and_step_async(rollouts)
 
         t_step_env = time.time()
 
-        outputs = self.envs.step([a[0].item() for a in actions])
-        observations, rewards, dones, infos = [list(x) for x in zip(*outputs)]
+        outputs = self.envs.step_wait()
+
+        # single pass over the step outputs into reusable buffers instead of
+        # materializing transposed python lists with zip(*outputs)
+        if self._reward_buffer is None or len(self._reward_buffer) != len(outputs):
+            self._reward_buffer = np.empty(len(outputs), dtype=np.float32)
+            self._done_buffer = np.empty(len(outputs), dtype=bool)
+            self._mask_buffer = np.empty(len(outputs), dtype=np.float32)
+            self._rewards_t = torch.zeros(
+                len(outputs), 1, device=current_episode_reward.device
+            )
+            self._masks_t = torch.zeros_like(self._rewards_t)
+        observations = []
+        infos = []
+        for i, (obs, reward, done, info) in enumerate(outputs):
+            observations.append(obs)
+            infos.append(info)
+            self._reward_buffer[i] = reward
+            self._done_buffer[i] = done
         # print(actions)
-        # if not dones[0]: 
-        #     
+        # if not dones[0]:
+        #
         #     if rewards[0]== 1 and (actions==5).any().item() == 5:
-        #         self.envs.act("close")
+        #         self.envs.act_at(0, "close")
         #         print("ttttttttgthyhy")
 
 
         env_time += time.time() - t_step_env
 
+        (
+            values,
+            actions,
+            actions_log_probs,
+            recurrent_hidden_states,
+        ) = self._pending_policy_outputs
+        self._pending_policy_outputs = None
+
         t_update_stats = time.time()
         batch = self.batch_obs(observations, device=self.device)
-        rewards = torch.tensor(
-            rewards, dtype=torch.float, device=current_episode_reward.device
-        )
-        rewards = rewards.unsqueeze(1)
-
-        masks = torch.tensor(
-            [[0.0] if done else [1.0] for done in dones],
-            dtype=torch.float,
-            device=current_episode_reward.device,
-        )
-
-        current_episode_reward += rewards
-        running_episode_stats["reward"] += (1 - masks) * current_episode_reward
-        running_episode_stats["count"] += 1 - masks
-        for k, v in self._extract_scalars_from_infos(infos).items():
-            v = torch.tensor(
-                v, dtype=torch.float, device=current_episode_reward.device
-            ).unsqueeze(1)
-            if k not in running_episode_stats:
-                running_episode_stats[k] = torch.zeros_like(
-                    running_episode_stats["count"]
-                )
+        # fill the preallocated tensors in place rather than allocating new
+        # reward/mask tensors every step
+        rewards = self._rewards_t
+        rewards.copy_(torch.from_numpy(self._reward_buffer).unsqueeze(1))
 
-            running_episode_stats[k] += (1 - masks) * v
-
-        current_episode_reward *= masks
+        np.subtract(1.0, self._done_buffer, out=self._mask_buffer)
+        masks = self._masks_t
+        masks.copy_(torch.from_numpy(self._mask_buffer).unsqueeze(1))
 
         if self._static_encoder:
             with torch.no_grad():
@@ -267,16 +556,49 @@ class PPOTrainer(BaseRLTrainer):
             masks,
         )
 
+        # dispatch the next env step before the stats bookkeeping below so
+        # the simulators run while we do python-side work. Never dispatch
+        # past the rollout boundary: the agent update changes the policy.
+        # (the sample time is covered by the t_update_stats window)
+        if rollouts.step < rollouts.num_steps:
+            self._sample_actions_and_step_async(rollouts)
+
+        _update_reward_stats(
+            current_episode_reward,
+            rewards,
+            masks,
+            running_episode_stats["reward"],
+            running_episode_stats["count"],
+        )
+
+        info_scalars = self._extract_scalars_from_infos(infos)
+        if len(info_scalars) > 0:
+            keys = list(info_scalars)
+            if keys != self._info_stats_keys:
+                self._rebuild_info_stats(keys, running_episode_stats)
+
+            # one (K, num_envs, 1) tensor and a single masked add for all
+            # info keys instead of a torch.tensor + add per key
+            info_t = (
+                torch.from_numpy(
+                    np.asarray(
+                        [info_scalars[k] for k in self._info_stats_keys],
+                        dtype=np.float32,
+                    )
+                )
+                .unsqueeze(2)
+                .to(device=current_episode_reward.device)
+            )
+            self._info_stats_base += (1 - masks) * info_t
+
         pth_time += time.time() - t_update_stats
 
         return pth_time, env_time, self.envs.num_envs
 
     def _update_agent(self, ppo_cfg, rollouts):
         t_update_model = time.time()
-        with torch.no_grad():
-            last_observation = {
-                k: v[rollouts.step] for k, v in rollouts.observations.items()
-            }
+        with torch.inference_mode():
+            last_observation = rollouts.get_step_observation(rollouts.step)
             next_value = self.actor_critic.get_value(
                 last_observation,
                 rollouts.recurrent_hidden_states[rollouts.step],
@@ -316,11 +638,11 @@ class PPOTrainer(BaseRLTrainer):
         Returns:
             None
         """
-        print("prelauda")
+        logger.debug("prelauda")
         self.envs = construct_envs(
             self.config, get_env_class(self.config.ENV.ENV_NAME)
         )
-        print("lauda")
+        logger.debug("lauda")
         ppo_cfg = self.config.RL.PPO
         self.device = (
             torch.device("cuda", self.config.TORCH_GPU_ID)
@@ -366,7 +688,7 @@ class PPOTrainer(BaseRLTrainer):
             reward=torch.zeros(self.envs.num_envs, 1),
         )
         window_episode_stats = defaultdict(
-            lambda: deque(maxlen=ppo_cfg.reward_window_size)
+            lambda: TensorWindow(maxlen=ppo_cfg.reward_window_size)
         )
 
         t_start = time.time()
@@ -392,7 +714,14 @@ class PPOTrainer(BaseRLTrainer):
                         update, self.config.NUM_UPDATES
                     )
 
-                for step in tqdm.tqdm(range(ppo_cfg.num_steps)): # [!!] Add tqdm
+                # throttle the refresh rate; a redraw per env step adds a
+                # stderr write to the hot loop
+                for step in tqdm.tqdm(
+                    range(ppo_cfg.num_steps),
+                    mininterval=0.5,
+                    miniters=max(1, ppo_cfg.num_steps // 20),
+                    disable=None,
+                ): # [!!] Add tqdm
                     (
                         delta_pth_time,
                         delta_env_time,
@@ -413,16 +742,18 @@ class PPOTrainer(BaseRLTrainer):
                 pth_time += delta_pth_time
 
                 for k, v in running_episode_stats.items():
-                    window_episode_stats[k].append(v.clone())
-
-                deltas = {
-                    k: (
-                        (v[-1] - v[0]).sum().item()
-                        if len(v) > 1
-                        else v[0].sum().item()
-                    )
-                    for k, v in window_episode_stats.items()
-                }
+                    window_episode_stats[k].append(v)
+
+                # one stacked reduction and a single GPU->CPU transfer for
+                # all keys instead of a .sum().item() sync per key
+                stat_keys = list(window_episode_stats.keys())
+                delta_t = torch.stack(
+                    [
+                        (v[-1] - v[0]) if len(v) > 1 else v[0]
+                        for v in window_episode_stats.values()
+                    ]
+                ).sum(dim=(1, 2))
+                deltas = dict(zip(stat_keys, delta_t.tolist()))
                 deltas["count"] = max(deltas["count"], 1.0)
 
                 writer.add_scalar(
@@ -485,887 +816,29 @@ class PPOTrainer(BaseRLTrainer):
                     )
                     count_checkpoints += 1
 
-            self.envs.close()
-
-    def get_action(self,index, act_to_idx):
-        for action, idx in act_to_idx.items():
-            if idx == index:
-                return action
-        return None
-
-    def eval(self) -> None:
-
-        if E2E:
-            os.makedirs(os.path.join(self.config.CHECKPOINT_FOLDER, 'eval/'), exist_ok=True)
-
-            # add test episode information to config
-            test_episodes = json.load(open(self.config.EVAL.DATASET))
-            self.config.defrost()
-            self.config.ENV.TEST_EPISODES = test_episodes
-            self.config.ENV.TEST_EPISODE_COUNT = len(test_episodes)
-            self.config.freeze()
-
-            # Map location CPU is almost always better than mapping to a CUDA device.
-            checkpoint_path = self.config.LOAD
-            ckpt_dict = self.load_checkpoint(checkpoint_path, map_location="cpu")
-            ppo_cfg = self.config.RL.PPO
-
-            logger.info(f"env config: {self.config}")
-            self.envs = construct_envs(self.config, get_env_class(self.config.ENV.ENV_NAME))
-            self._setup_actor_critic_agent(ppo_cfg)
-
-            # [!!] Log extra stuff
-            logger.info(checkpoint_path)
-            logger.info(f"num_steps: {self.config.ENV.NUM_STEPS}")
-
-            # [!!] Only load if present
-            if ckpt_dict is not None:
-                self.agent.load_state_dict(ckpt_dict["state_dict"])
-            else:
-                logger.info('NO CHECKPOINT LOADED!')
-            self.actor_critic = self.agent.actor_critic
-
-            observations = self.envs.reset()
-            batch = self.batch_obs(observations, self.device)
-
-            current_episode_reward = torch.zeros(
-                self.envs.num_envs, 1, device=self.device
-            )
-
-            test_recurrent_hidden_states = torch.zeros(
-                self.actor_critic.net.num_recurrent_layers,
-                self.config.NUM_PROCESSES,
-                ppo_cfg.hidden_size,
-                device=self.device,
-            )
-            prev_actions = torch.zeros(
-                self.config.NUM_PROCESSES, 1, device=self.device, dtype=torch.long
-            )
-            not_done_masks = torch.zeros(
-                self.config.NUM_PROCESSES, 1, device=self.device
-            )
-            stats_episodes = dict()  # dict of dicts that stores stats per episode
-
-            rgb_frames = [
-                [] for _ in range(self.config.NUM_PROCESSES)
-            ]  # type: List[List[np.ndarray]]
-
-            # [!!] Store extra information about the trajectory that the env does not return
-            episode_infos = [[] for _ in range(self.config.NUM_PROCESSES)]
-
-            pbar = tqdm.tqdm()
-            self.actor_critic.eval()
-            print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-            print(self.config.ENV.TEST_EPISODE_COUNT)
-            print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-
-            action_list = []
-            observation_list = []
-            prev_obs = [None]
-            metadata_list = []
-            obj_cov_step=[]
-            obj_pick_step=[]
-            step_count = 0
-            prev_obs = [None]
-            last_five_actions = deque(maxlen=5)
-            while (
-                len(stats_episodes) < self.config.ENV.TEST_EPISODE_COUNT
-                and self.envs.num_envs > 0
-            ):
-
-                # [!!] Show more fine-grained progress. THOR is slow!
-                pbar.update()
-                
-                current_episodes = self.envs.current_episodes()
-
-                with torch.no_grad():
-                    (
-                        _,
-                        actions,
-                        _,
-                        test_recurrent_hidden_states,
-                    ) = self.actor_critic.act(
-                        batch,
-                        test_recurrent_hidden_states,
-                        prev_actions,
-                        not_done_masks,
-                        deterministic=False,
-                    )
-
-                    prev_actions.copy_(actions)
-                
-                outputs = self.envs.step([a[0].item() for a in actions])
-                observations, rewards, dones, infos = [
-                    list(x) for x in zip(*outputs)
-                ]
-                step_count +=1
-                batch = self.batch_obs(observations, self.device)
-
-                not_done_masks = torch.tensor(
-                    [[0.0] if done else [1.0] for done in dones],
-                    dtype=torch.float,
-                    device=self.device,
-                )
-                act_to_idx = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4,'take':5, 'put':6, 'open': 7, 'close': 8}
-
-
-                # last_five_actions.append([infos[0]["action"],infos[0]["success"]])
-                # if len(last_five_actions) == 5 and all(x == last_five_actions[0] for x in last_five_actions):
-                #     print("horiya")
-                #     times = random.randint(1, 3)  # Randomly choose to call 1, 2, or 3 times
-                #     for _ in range(times):
-                #         result = self.envs.act("tright")
-                #     self.envs.act("forward")
-                #     self.envs.act("forward")
-                #     self.envs.act("forward")
-                #     self.envs.act("forward")                               
-                    
-
-                if not dones[0]:
-
-                    if infos[0]["success"]:#more exploration observed
-                    # if :
-                        # if self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                        # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '2'), observations[0]["rgb"])
-                        # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '1'), prev_obs[0]["rgb"])
-                        if rewards[0]== 1 and self.get_action(actions.item(),act_to_idx)=="open":
-                            print("badiya")
-                            obj_cov_step.append(step_count)
-                                           
-                            action_list.append("open")
-                            observation_list.append([prev_obs[0],observations[0]])
-                            metadata_list.append([infos[0]["prev_metadata"],infos[0]["next_metadata"]]) 
-
-
-                        if (rewards[0]== 2 or rewards[0]== 5) and self.get_action(actions.item(),act_to_idx)=="take":#more exploration observed
-                        # if infos[0]["success"]:
-                            # if self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                            # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '2'), observations[0]["rgb"])
-                            # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '1'), prev_obs[0]["rgb"])
-                            if self.get_action(actions.item(),act_to_idx)=="take":
-                                print("bbhot badiya")
-                                obj_pick_step.append(step_count)
-
-                            action_list.append("take")
-                            observation_list.append([prev_obs[0],observations[0]])
-                            metadata_list.append([infos[0]["prev_metadata"],infos[0]["next_metadata"]]) 
-                                                            
-
-
-                if dones[0]:
-
-                    scene = current_episodes[0]['scene_id']
-                    episode = current_episodes[0]['episode_id']
-
-                    # Create filename
-                    filename = f"E2E_rollouts/{scene}_{episode}.pkl"
-
-                    # Data to save
-                    data_to_save = {'action_list': action_list, 'observation_list': observation_list,"obj_cov_step":obj_cov_step,"obj_pick_step":obj_pick_step,"metadata_list":metadata_list}  # Replace with your actual data
-
-                    # Save data to pickle file
-                    with open(filename, 'wb') as f:
-                        pickle.dump(data_to_save, f)
-
-                    action_list = []
-                    observation_list = [] 
-                    metadata_list = []
-                    obj_cov_step = []
-                    obj_pick_step = []
-
-
-                rewards = torch.tensor(
-                    rewards, dtype=torch.float, device=self.device
-                ).unsqueeze(1)
-
-                current_episode_reward += rewards
-
-                # # [!!] store epiode history
-                # for i in range(self.envs.num_envs):
-                #     episode_infos[i].append(infos[i])
-
-
-                next_episodes = self.envs.current_episodes()
-                envs_to_pause = []
-                n_envs = self.envs.num_envs
-                prev_obs = observations
-                # for i in range(n_envs):
-
-                #     if (
-                #         next_episodes[i]['scene_id'],
-                #         next_episodes[i]['episode_id'],
-                #     ) in stats_episodes:
-                #         envs_to_pause.append(i)
-
-                #     # episode ended
-                #     if not_done_masks[i].item() == 0:
-                #         # pbar.update()
-                #         episode_stats = dict()
-                #         episode_stats["reward"] = current_episode_reward[i].item()
-                #         episode_stats.update(
-                #             self._extract_scalars_from_info(infos[i])
-                #         )
-                #         current_episode_reward[i] = 0
-
-
-                #         # [!!] Add per-step episode information
-                #         episode_info = []
-                #         for info in episode_infos[i]:
-                #             act_data = {'reward': info['reward'], 'action': info['action'], 'target': None, 'success': info['success']} 
-                #             if 'target' in info:
-                #                 act_data['target'] = info['target']['objectId']
-                #             episode_info.append(act_data)
-                #         episode_stats['step_info'] = episode_info
-                #         episode_infos[i] = []
-
-                #         # use scene_id + episode_id as unique id for storing stats
-                #         stats_episodes[
-                #             (
-                #                 current_episodes[i]['scene_id'],
-                #                 current_episodes[i]['episode_id'],
-                #             )
-                #         ] = episode_stats
-
-                #         # [!!] Save episode data in the eval folder for processing
-                #         scene, episode = current_episodes[i]['scene_id'], current_episodes[i]['episode_id']
-                #         torch.save({'scene_id':scene,
-                #                     'episode_id':episode,
-                #                     'stats':episode_stats},
-                #                     f'{self.config.CHECKPOINT_FOLDER}/eval/{scene}_{episode}.pth')
-                        
-                
-
-
-                (
-                    self.envs,
-                    test_recurrent_hidden_states,
-                    not_done_masks,
-                    current_episode_reward,
-                    prev_actions,
-                    batch,
-                    rgb_frames,
-                ) = self._pause_envs(
-                    envs_to_pause,
-                    self.envs,
-                    test_recurrent_hidden_states,
-                    not_done_masks,
-                    current_episode_reward,
-                    prev_actions,
-                    batch,
-                    rgb_frames,
-                )
-
-            num_episodes = len(stats_episodes)
-            aggregated_stats = dict()
-            # for stat_key in next(iter(stats_episodes.values())).keys(): # [!!] Only output reward
-            for stat_key in ['reward']:
-                aggregated_stats[stat_key] = (
-                    sum([v[stat_key] for v in stats_episodes.values()])
-                    / num_episodes
-                )
-
-            for k, v in aggregated_stats.items():
-                logger.info(f"Average episode {k}: {v:.4f}")
+            # make sure the last background checkpoint write has finished
+            if self._checkpoint_future is not None:
+                self._checkpoint_future.result()
+                self._checkpoint_future = None
 
             self.envs.close()
-        if HYBRID:
-            os.makedirs(os.path.join(self.config.CHECKPOINT_FOLDER, 'eval/'), exist_ok=True)
-
-            # add test episode information to config
-            test_episodes = json.load(open(self.config.EVAL.DATASET))
-            self.config.defrost()
-            self.config.ENV.TEST_EPISODES = test_episodes
-            self.config.ENV.TEST_EPISODE_COUNT = len(test_episodes)
-            self.config.freeze()
-
-            # Map location CPU is almost always better than mapping to a CUDA device.
-            checkpoint_path = self.config.LOAD
-            ckpt_dict = self.load_checkpoint(checkpoint_path, map_location="cpu")
-            ppo_cfg = self.config.RL.PPO
-
-            logger.info(f"env config: {self.config}")
-            self.envs = construct_envs(self.config, get_env_class(self.config.ENV.ENV_NAME))
-            self._setup_actor_critic_agent(ppo_cfg)
-
-            # [!!] Log extra stuff
-            logger.info(checkpoint_path)
-            logger.info(f"num_steps: {self.config.ENV.NUM_STEPS}")
-
-            # [!!] Only load if present
-            if ckpt_dict is not None:
-                self.agent.load_state_dict(ckpt_dict["state_dict"])
-            else:
-                logger.info('NO CHECKPOINT LOADED!')
-            self.actor_critic = self.agent.actor_critic
-
-            observations = self.envs.reset()
-            batch = self.batch_obs(observations, self.device)
-
-            current_episode_reward = torch.zeros(
-                self.envs.num_envs, 1, device=self.device
-            )
-
-            test_recurrent_hidden_states = torch.zeros(
-                self.actor_critic.net.num_recurrent_layers,
-                self.config.NUM_PROCESSES,
-                ppo_cfg.hidden_size,
-                device=self.device,
-            )
-            prev_actions = torch.zeros(
-                self.config.NUM_PROCESSES, 1, device=self.device, dtype=torch.long
-            )
-            not_done_masks = torch.zeros(
-                self.config.NUM_PROCESSES, 1, device=self.device
-            )
-            stats_episodes = dict()  # dict of dicts that stores stats per episode
-
-            rgb_frames = [
-                [] for _ in range(self.config.NUM_PROCESSES)
-            ]  # type: List[List[np.ndarray]]
-
-            # [!!] Store extra information about the trajectory that the env does not return
-            episode_infos = [[] for _ in range(self.config.NUM_PROCESSES)]
-
-            pbar = tqdm.tqdm()
-            self.actor_critic.eval()
-            print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-            print(self.config.ENV.TEST_EPISODE_COUNT)
-            print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-            action_list = []
-            observation_list = []
-            prev_obs = [None]
-            last_five_actions = deque(maxlen=5)
-            metadata_list = []
-            obj_cov_step=[]
-            obj_pick_step=[]
-            step_count = 0
-            while (
-                len(stats_episodes) < self.config.ENV.TEST_EPISODE_COUNT
-                and self.envs.num_envs > 0
-            ):
-
-                # [!!] Show more fine-grained progress. THOR is slow!
-                pbar.update()
-                
-                current_episodes = self.envs.current_episodes()
-
-                with torch.no_grad():
-                    (
-                        _,
-                        actions,
-                        _,
-                        test_recurrent_hidden_states,
-                    ) = self.actor_critic.act(
-                        batch,
-                        test_recurrent_hidden_states,
-                        prev_actions,
-                        not_done_masks,
-                        deterministic=False,
-                    )
-
-                    prev_actions.copy_(actions)
-                
-                outputs = self.envs.step([a[0].item() for a in actions])
-                observations, rewards, dones, infos = [
-                    list(x) for x in zip(*outputs)
-                ]
-                step_count+=1
-                batch = self.batch_obs(observations, self.device)
-
-                not_done_masks = torch.tensor(
-                    [[0.0] if done else [1.0] for done in dones],
-                    dtype=torch.float,
-                    device=self.device,
-                )
-                act_to_idx = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'open': 5, 'close': 6}
-                # print(infos[0]["action"],infos[0]["success"])
-
-                last_five_actions.append([infos[0]["action"],infos[0]["success"]])
-                if len(last_five_actions) == 5 and all(x == last_five_actions[0] for x in last_five_actions):
-                    print("horiya")
-                    times = random.randint(1, 3)  # Randomly choose to call 1, 2, or 3 times
-                    for _ in range(times):
-                        result = self.envs.act("tright")
-                    self.envs.act("forward")
-                    self.envs.act("forward")
-                    self.envs.act("forward")
-                    self.envs.act("forward")                               
-                    
-
-                if not dones[0]:
-
-                    # if rewards[0]== 1:#more exploration observed
-                    if infos[0]["success"]:
-                        # if self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                        #     # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '2'), observations[0]["rgb"])
-                        #     # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '1'), prev_obs[0]["rgb"])
-                        #     action_list.append(self.get_action(actions.item(),act_to_idx))
-                        #     observation_list.append([prev_obs[0],observations[0]])
-                        #     metadata_list.append([info["prev_metadata"],info["next_metadata"]]) 
-
-                        if self.get_action(actions.item(),act_to_idx) == "open":
-                            if rewards[0]== 1:
-                                print("badiya")
-                                obj_cov_step.append(step_count)
-                                action_list.append("open")
-                                observation_list.append([prev_obs[0],observations[0]])
-                                metadata_list.append([info["prev_metadata"],info["next_metadata"]]) 
-
-                        info = self.envs.act("take")
-                        if info["success"]:
-                            print("bhot badiya")
-                            obj_pick_step.append(step_count)
-                            action_list.append("take")
-                            observation_list.append([info["prev_obs"]["rgb"],info["next_obs"]["rgb"]])
-                            metadata_list.append([info["prev_metadata"],info["next_metadata"]]) 
-
-
-                        info = self.envs.act("put")
-
-                                
-
-
-                        self.envs.act("close")
-                            
-                                                        
-
 
-                if dones[0]:
-
-                    scene = current_episodes[0]['scene_id']
-                    episode = current_episodes[0]['episode_id']
-
-                    # Create filename
-                    filename = f"Hybrid_rollouts/{scene}_{episode}.pkl"
-
-                    # Data to save
-                    data_to_save = {'action_list': action_list, 'observation_list': observation_list,"obj_cov_step":obj_cov_step,"obj_pick_step":obj_pick_step,"metadata_list":metadata_list}  # Replace with your actual data
-
-                    # Save data to pickle file
-                    with open(filename, 'wb') as f:
-                        pickle.dump(data_to_save, f)
-
-                    action_list = []
-                    observation_list = [] 
-                    metadata_list = []
-                    obj_cov_step = []
-                    obj_pick_step = []
-
-
-                rewards = torch.tensor(
-                    rewards, dtype=torch.float, device=self.device
-                ).unsqueeze(1)
-
-                current_episode_reward += rewards
-
-                # # [!!] store epiode history
-                # for i in range(self.envs.num_envs):
-                #     episode_infos[i].append(infos[i])
+    # inverse act_to_idx tables, keyed by the mapping items so each distinct
+    # action set is inverted only once instead of per lookup
+    _idx_to_act_cache = {}
 
-
-                next_episodes = self.envs.current_episodes()
-                envs_to_pause = []
-                n_envs = self.envs.num_envs
-                prev_obs = observations
-                # for i in range(n_envs):
-
-                #     if (
-                #         next_episodes[i]['scene_id'],
-                #         next_episodes[i]['episode_id'],
-                #     ) in stats_episodes:
-                #         envs_to_pause.append(i)
-
-                #     # episode ended
-                #     if not_done_masks[i].item() == 0:
-                #         # pbar.update()
-                #         episode_stats = dict()
-                #         episode_stats["reward"] = current_episode_reward[i].item()
-                #         episode_stats.update(
-                #             self._extract_scalars_from_info(infos[i])
-                #         )
-                #         current_episode_reward[i] = 0
-
-
-                #         # [!!] Add per-step episode information
-                #         episode_info = []
-                #         for info in episode_infos[i]:
-                #             act_data = {'reward': info['reward'], 'action': info['action'], 'target': None, 'success': info['success']} 
-                #             if 'target' in info:
-                #                 act_data['target'] = info['target']['objectId']
-                #             episode_info.append(act_data)
-                #         episode_stats['step_info'] = episode_info
-                #         episode_infos[i] = []
-
-                #         # use scene_id + episode_id as unique id for storing stats
-                #         stats_episodes[
-                #             (
-                #                 current_episodes[i]['scene_id'],
-                #                 current_episodes[i]['episode_id'],
-                #             )
-                #         ] = episode_stats
-
-                #         # [!!] Save episode data in the eval folder for processing
-                #         scene, episode = current_episodes[i]['scene_id'], current_episodes[i]['episode_id']
-                #         torch.save({'scene_id':scene,
-                #                     'episode_id':episode,
-                #                     'stats':episode_stats},
-                #                     f'{self.config.CHECKPOINT_FOLDER}/eval/{scene}_{episode}.pth')
-                        
-                
-
-
-                (
-                    self.envs,
-                    test_recurrent_hidden_states,
-                    not_done_masks,
-                    current_episode_reward,
-                    prev_actions,
-                    batch,
-                    rgb_frames,
-                ) = self._pause_envs(
-                    envs_to_pause,
-                    self.envs,
-                    test_recurrent_hidden_states,
-                    not_done_masks,
-                    current_episode_reward,
-                    prev_actions,
-                    batch,
-                    rgb_frames,
-                )
-
-            num_episodes = len(stats_episodes)
-            aggregated_stats = dict()
-            # for stat_key in next(iter(stats_episodes.values())).keys(): # [!!] Only output reward
-            for stat_key in ['reward']:
-                aggregated_stats[stat_key] = (
-                    sum([v[stat_key] for v in stats_episodes.values()])
-                    / num_episodes
-                )
-
-            for k, v in aggregated_stats.items():
-                logger.info(f"Average episode {k}: {v:.4f}")
-
-            self.envs.close()
-
-        if OBCOV:
-            os.makedirs(os.path.join(self.config.CHECKPOINT_FOLDER, 'eval/'), exist_ok=True)
-
-            # add test episode information to config
-            test_episodes = json.load(open(self.config.EVAL.DATASET))
-            self.config.defrost()
-            self.config.ENV.TEST_EPISODES = test_episodes
-            self.config.ENV.TEST_EPISODE_COUNT = len(test_episodes)
-            self.config.freeze()
-
-            # Map location CPU is almost always better than mapping to a CUDA device.
-            checkpoint_path = self.config.LOAD
-            ckpt_dict = self.load_checkpoint(checkpoint_path, map_location="cpu")
-            ppo_cfg = self.config.RL.PPO
-
-            logger.info(f"env config: {self.config}")
-            self.envs = construct_envs(self.config, get_env_class(self.config.ENV.ENV_NAME))
-            self._setup_actor_critic_agent(ppo_cfg)
-
-            # [!!] Log extra stuff
-            logger.info(checkpoint_path)
-            logger.info(f"num_steps: {self.config.ENV.NUM_STEPS}")
-
-            # [!!] Only load if present
-            if ckpt_dict is not None:
-                self.agent.load_state_dict(ckpt_dict["state_dict"])
-            else:
-                logger.info('NO CHECKPOINT LOADED!')
-            self.actor_critic = self.agent.actor_critic
-
-            observations = self.envs.reset()
-            batch = self.batch_obs(observations, self.device)
-
-            current_episode_reward = torch.zeros(
-                self.envs.num_envs, 1, device=self.device
-            )
-
-            test_recurrent_hidden_states = torch.zeros(
-                self.actor_critic.net.num_recurrent_layers,
-                self.config.NUM_PROCESSES,
-                ppo_cfg.hidden_size,
-                device=self.device,
-            )
-            prev_actions = torch.zeros(
-                self.config.NUM_PROCESSES, 1, device=self.device, dtype=torch.long
-            )
-            not_done_masks = torch.zeros(
-                self.config.NUM_PROCESSES, 1, device=self.device
-            )
-            stats_episodes = dict()  # dict of dicts that stores stats per episode
-
-            rgb_frames = [
-                [] for _ in range(self.config.NUM_PROCESSES)
-            ]  # type: List[List[np.ndarray]]
-
-            # [!!] Store extra information about the trajectory that the env does not return
-            episode_infos = [[] for _ in range(self.config.NUM_PROCESSES)]
-
-            pbar = tqdm.tqdm()
-            self.actor_critic.eval()
-            print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-            print(self.config.ENV.TEST_EPISODE_COUNT)
-            print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-            action_list = []
-            observation_list = []
-            metadata_list = []
-            obj_cov_step=[]
-            obj_pick_step=[]
-            last_five_actions = deque(maxlen=5)
-            last_five_success = deque(maxlen=5)
-            step_count = 0
-            while (
-                len(stats_episodes) < self.config.ENV.TEST_EPISODE_COUNT
-                and self.envs.num_envs > 0
-            ):
-
-                # [!!] Show more fine-grained progress. THOR is slow!
-                pbar.update()
-                
-                current_episodes = self.envs.current_episodes()
-
-                with torch.no_grad():
-                    (
-                        _,
-                        actions,
-                        _,
-                        test_recurrent_hidden_states,
-                    ) = self.actor_critic.act(
-                        batch,
-                        test_recurrent_hidden_states,
-                        prev_actions,
-                        not_done_masks,
-                        deterministic=False,
-                    )
-
-                    prev_actions.copy_(actions)
-                
-                outputs = self.envs.step([a[0].item() for a in actions])
-                observations, rewards, dones, infos = [
-                    list(x) for x in zip(*outputs)
-                ]
-                
-                batch = self.batch_obs(observations, self.device)
-
-                not_done_masks = torch.tensor(
-                    [[0.0] if done else [1.0] for done in dones],
-                    dtype=torch.float,
-                    device=self.device,
-                )
-                step_count+=1
-                # print(infos[0]["action"],infos[0]["success"])
-                last_five_actions.append([infos[0]["action"],infos[0]["success"]])
-                last_five_success.append(infos[0]["success"])
-                # print(last_five_success)
-                # if len(last_five_actions) == 5 and (all(x == last_five_actions[0] for x in last_five_actions) or all(x == last_five_success[0] for x in last_five_success)):
-                #     print("horiya")
-                #     self.envs.act("close")
-                #     self.envs.act("put") 
-                #     self.envs.act("up") 
-                #     self.envs.act("close")
-                #     self.envs.act("put") 
-                #     self.envs.act("down") 
-                #     self.envs.act("down") 
-                #     self.envs.act("close") 
-                #     self.envs.act("put")
-
-                #     times = random.randint(1, 3)  # Randomly choose to call 1, 2, or 3 times
-                #     for _ in range(times):
-                #         result = self.envs.act("tright")
-                #     self.envs.act("forward")
-                #     self.envs.act("forward")
-                #     self.envs.act("forward")
-                #     self.envs.act("forward")  
-                #     # self.envs.act("close") 
-                                                
-
-                # print(infos[0]['traj_masks'])
-                # act_to_idx = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'take': 5, 'put': 6, 'open': 7, 'close': 8, 'toggle-on': 9, 'toggle-off': 10, 'slice': 11}
-                act_to_idx = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'open': 5, 'close': 6}
-                # print(type(observations[0]["rgb"]))
-                # print(actions)
-                # print(rewards)
-                # print(infos[0])
-                # print(dones)
-                if not dones[0]:
-                    # print(actions.item())
-                    if rewards[0]== 1:
-                        print("hmm")
-                        print(step_count)
-                        obj_cov_step.append(step_count)
-                        info = self.envs.act("open")
-                        if info["success"]:
-                            action_list.append("open")
-                            observation_list.append([info["prev_obs"]["rgb"],info["next_obs"]["rgb"]])
-                            metadata_list.append([info["prev_metadata"],info["next_metadata"]])
-
-                        info = self.envs.act("take")
-
-                        if info["success"]:
-                            print("wall done")
-                            obj_pick_step.append(step_count)
-                            action_list.append("take")
-                            observation_list.append([info["prev_obs"]["rgb"],info["next_obs"]["rgb"]])
-                            metadata_list.append([info["prev_metadata"],info["next_metadata"]])  
-
-                        self.envs.act("put")
-                        self.envs.act("close")
-                    #     # if self.get_action(actions.item(),act_to_idx) == "take" or self.get_action(actions.item(),act_to_idx) == "put" or self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                    #     if self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                    #     # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '2'), observations[0]["rgb"])
-                    #         # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '1'), prev_obs[0]["rgb"])
-
-
-
-                        outputs = self.envs.step([a[0].item() for a in actions])
-                        observations, rewards, dones, infos = [
-                            list(x) for x in zip(*outputs)
-                        ]
-                        
-                        batch = self.batch_obs(observations, self.device)
-
-                        not_done_masks = torch.tensor(
-                            [[0.0] if done else [1.0] for done in dones],
-                            dtype=torch.float,
-                            device=self.device,
-                        )
-
-                        # action_list.append(self.get_action(actions.item(),act_to_idx))
-                        # observation_list.append([prev_obs[0],observations[0]])
-
-
-
-
-
-                if dones[0]:
-
-                    scene = current_episodes[0]['scene_id']
-                    episode = current_episodes[0]['episode_id']
-
-                    # Create filename
-                    filename = f"{scene}_{episode}.pkl"
-
-                    # Data to save
-                    data_to_save = {'action_list': action_list, 'observation_list': observation_list,"obj_cov_step":obj_cov_step,"obj_pick_step":obj_pick_step,"metadata_list":metadata_list}  # Replace with your actual data
-
-                    # Save data to pickle file
-                    with open(filename, 'wb') as f:
-                        pickle.dump(data_to_save, f)
-
-                    action_list = []
-                    observation_list = [] 
-                    metadata_list = []
-                    obj_cov_step = []
-                    obj_pick_step = []
-
-
-
-                rewards = torch.tensor(
-                    rewards, dtype=torch.float, device=self.device
-                ).unsqueeze(1)
-
-                current_episode_reward += rewards
-
-                # # [!!] store epiode history
-                # for i in range(self.envs.num_envs):
-                #     episode_infos[i].append(infos[i])
-
-
-                next_episodes = self.envs.current_episodes()
-                envs_to_pause = []
-                n_envs = self.envs.num_envs
-                prev_obs = observations
-                # for i in range(n_envs):
-
-                #     if (
-                #         next_episodes[i]['scene_id'],
-                #         next_episodes[i]['episode_id'],
-                #     ) in stats_episodes:
-                #         envs_to_pause.append(i)
-
-                #     # episode ended
-                #     if not_done_masks[i].item() == 0:
-                #         # pbar.update()
-                #         episode_stats = dict()
-                #         episode_stats["reward"] = current_episode_reward[i].item()
-                #         episode_stats.update(
-                #             self._extract_scalars_from_info(infos[i])
-                #         )
-                #         current_episode_reward[i] = 0
-
-
-                #         # [!!] Add per-step episode information
-                #         episode_info = []
-                #         for info in episode_infos[i]:
-                #             act_data = {'reward': info['reward'], 'action': info['action'], 'target': None, 'success': info['success']} 
-                #             if 'target' in info:
-                #                 act_data['target'] = info['target']['objectId']
-                #             episode_info.append(act_data)
-                #         episode_stats['step_info'] = episode_info
-                #         episode_infos[i] = []
-
-                #         # use scene_id + episode_id as unique id for storing stats
-                #         stats_episodes[
-                #             (
-                #                 current_episodes[i]['scene_id'],
-                #                 current_episodes[i]['episode_id'],
-                #             )
-                #         ] = episode_stats
-
-                #         # [!!] Save episode data in the eval folder for processing
-                #         scene, episode = current_episodes[i]['scene_id'], current_episodes[i]['episode_id']
-                #         torch.save({'scene_id':scene,
-                #                     'episode_id':episode,
-                #                     'stats':episode_stats},
-                #                     f'{self.config.CHECKPOINT_FOLDER}/eval/{scene}_{episode}.pth')
-                        
-                
-
-
-                (
-                    self.envs,
-                    test_recurrent_hidden_states,
-                    not_done_masks,
-                    current_episode_reward,
-                    prev_actions,
-                    batch,
-                    rgb_frames,
-                ) = self._pause_envs(
-                    envs_to_pause,
-                    self.envs,
-                    test_recurrent_hidden_states,
-                    not_done_masks,
-                    current_episode_reward,
-                    prev_actions,
-                    batch,
-                    rgb_frames,
-                )
-
-            num_episodes = len(stats_episodes)
-            aggregated_stats = dict()
-            # for stat_key in next(iter(stats_episodes.values())).keys(): # [!!] Only output reward
-            for stat_key in ['reward']:
-                aggregated_stats[stat_key] = (
-                    sum([v[stat_key] for v in stats_episodes.values()])
-                    / num_episodes
-                )
-
-            for k, v in aggregated_stats.items():
-                logger.info(f"Average episode {k}: {v:.4f}")
-
-            self.envs.close()
-
-    def no_action(self) -> None:
-        r"""Main method of trainer evaluation. Calls _eval_checkpoint() that
-        is specified in Trainer class that inherits from BaseRLTrainer
-        Returns:
-            None
+    def get_action(self,index, act_to_idx):
+        key = tuple(act_to_idx.items())
+        table = self._idx_to_act_cache.get(key)
+        if table is None:
+            table = {idx: action for action, idx in act_to_idx.items()}
+            self._idx_to_act_cache[key] = table
+        return table.get(index)
+
+    def _eval_setup(self):
+        r"""Shared setup for the eval rollout loops: load the test episodes
+        and checkpoint, construct the envs and the policy.
         """
-
         os.makedirs(os.path.join(self.config.CHECKPOINT_FOLDER, 'eval/'), exist_ok=True)
 
         # add test episode information to config
@@ -1395,6 +868,31 @@ class PPOTrainer(BaseRLTrainer):
             logger.info('NO CHECKPOINT LOADED!')
         self.actor_critic = self.agent.actor_critic
 
+        return ppo_cfg
+
+    # entered once for the whole eval instead of re-entering a grad-mode
+    # context on every step; nothing in eval records gradients
+    @torch.inference_mode()
+    def _eval_rollout_loop(self, step_hook, rollout_prefix, save_metadata=True):
+        r"""Generic eval rollout loop shared by the E2E/HYBRID/OBCOV branches
+        and no_action. Per-mode behaviour (stuck recovery, scripted macros,
+        which frame pairs get recorded) lives in step_hook, which receives
+        the mutable loop state and may re-step the envs as long as it also
+        refreshes state['batch'] and state['not_done_masks'].
+
+        Args:
+            step_hook: callable run once per step after the env step.
+            rollout_prefix: path prefix for the per-episode rollout pickles.
+            save_metadata: include the metadata/step-index keys in the dump.
+        """
+        ppo_cfg = self._eval_setup()
+
+        # create the dump directory up front instead of relying on it
+        # existing when the first episode finishes
+        prefix_dir = os.path.dirname(rollout_prefix)
+        if prefix_dir:
+            os.makedirs(prefix_dir, exist_ok=True)
+
         observations = self.envs.reset()
         batch = self.batch_obs(observations, self.device)
 
@@ -1415,22 +913,39 @@ class PPOTrainer(BaseRLTrainer):
             self.config.NUM_PROCESSES, 1, device=self.device
         )
         stats_episodes = dict()  # dict of dicts that stores stats per episode
+        # running per-key sums, updated as episodes finish, so the final
+        # averages are one division instead of a pass over every episode
+        stats_sums = defaultdict(float)
 
-        rgb_frames = [
-            [] for _ in range(self.config.NUM_PROCESSES)
-        ]  # type: List[List[np.ndarray]]
+        # only buffer frames when a video is actually wanted; appending
+        # full RGB frames every step is pure memory cost otherwise
+        rgb_frames = None  # type: Optional[List[List[np.ndarray]]]
+        if self.config.EVAL.SAVE_VIDEO:
+            rgb_frames = [[] for _ in range(self.config.NUM_PROCESSES)]
 
-        # [!!] Store extra information about the trajectory that the env does not return
-        episode_infos = [[] for _ in range(self.config.NUM_PROCESSES)]
-
-        pbar = tqdm.tqdm()
+        pbar = tqdm.tqdm(mininterval=0.5, disable=None)
         self.actor_critic.eval()
-        print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-        print(self.config.ENV.TEST_EPISODE_COUNT)
-        print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-        action_list = []
-        observation_list = []
-        last_five_actions = deque(maxlen=5)
+        logger.info(f"test episode count: {self.config.ENV.TEST_EPISODE_COUNT}")
+
+        # mutable loop state shared with step_hook; hooks keep their own
+        # extras (e.g. the HYBRID action history) in here as well
+        state = {
+            'step_count': 0,
+            'part_count': 0,
+            'prev_rgb': None,
+            'action_list': [],
+            'observation_list': [],
+            'metadata_list': [],
+            'obj_cov_step': [],
+            'obj_pick_step': [],
+        }
+
+        # one-step software pipeline: the env-free tail of a step (rollout
+        # dump, reward accumulation, frame handoff) is deferred until the
+        # next step has been dispatched, so it overlaps with THOR rendering
+        # in the workers instead of adding to the serial step time
+        pending = None
+
         while (
             len(stats_episodes) < self.config.ENV.TEST_EPISODE_COUNT
             and self.envs.num_envs > 0
@@ -1438,231 +953,95 @@ class PPOTrainer(BaseRLTrainer):
 
             # [!!] Show more fine-grained progress. THOR is slow!
             pbar.update()
-            
-            current_episodes = self.envs.current_episodes()
 
-            with torch.no_grad():
-                (
-                    _,
-                    actions,
-                    _,
-                    test_recurrent_hidden_states,
-                ) = self.actor_critic.act(
-                    batch,
-                    test_recurrent_hidden_states,
-                    prev_actions,
-                    not_done_masks,
-                    deterministic=False,
-                )
-
-                prev_actions.copy_(actions)
-            
-            outputs = self.envs.step([a[0].item() for a in actions])
-            observations, rewards, dones, infos = [
-                list(x) for x in zip(*outputs)
-            ]
-            
-            batch = self.batch_obs(observations, self.device)
+            current_episodes = self.envs.current_episodes()
 
-            not_done_masks = torch.tensor(
-                [[0.0] if done else [1.0] for done in dones],
-                dtype=torch.float,
-                device=self.device,
+            (
+                _,
+                actions,
+                _,
+                test_recurrent_hidden_states,
+            ) = self.actor_critic.act(
+                batch,
+                test_recurrent_hidden_states,
+                prev_actions,
+                not_done_masks,
+                deterministic=False,
             )
-            # print(infos[0]["action"],infos[0]["success"])
-            last_five_actions.append([infos[0]["action"],infos[0]["success"]])
-
-            # if len(last_five_actions) == 5 and all(x == last_five_actions[0] for x in last_five_actions):
-            #     print("horiya")
-            #     times = random.randint(1, 3)  # Randomly choose to call 1, 2, or 3 times
-            #     for _ in range(times):
-            #         result = self.envs.act("tright")
-            #     self.envs.act("forward")
-            #     self.envs.act("forward")
-            #     self.envs.act("forward")
-            #     self.envs.act("forward")                               
-
-            # print(infos[0]['traj_masks'])
-            # act_to_idx = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'take': 5, 'put': 6, 'open': 7, 'close': 8, 'toggle-on': 9, 'toggle-off': 10, 'slice': 11}
-            act_to_idx = {'forward': 0, 'up': 1, 'down': 2, 'tright': 3, 'tleft': 4, 'open': 5, 'close': 6}
-            # print(type(observations[0]["rgb"]))
-            # print(actions)
-            # print(rewards)
-            # print(infos[0])
-            # print(dones)
-            if not dones[0]:
-                # print(actions.item())
-                if rewards[0]== 0.9:
-                    # if self.get_action(actions.item(),act_to_idx) == "take" or self.get_action(actions.item(),act_to_idx) == "put" or self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                    if self.get_action(actions.item(),act_to_idx) == "open" or self.get_action(actions.item(),act_to_idx) == "close":
-                       # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '2'), observations[0]["rgb"])
-                        # cv2.imwrite('{}_{}.png'.format(self.get_action(actions.item(),act_to_idx), '1'), prev_obs[0]["rgb"])
-                        action_list.append(self.get_action(actions.item(),act_to_idx))
-                        # observation_list.append([prev_obs[0],observations[0]])
-
-                # if self.get_action(actions.item(),act_to_idx) == "take":
-                #     actions = torch.tensor([[act_to_idx["put"]]])
-                #     outputs = self.envs.step([a[0].item() for a in actions])
-                #     observations, rewards, dones, infos = [
-                #         list(x) for x in zip(*outputs)
-                #     ]
-                    
-                #     batch = self.batch_obs(observations, self.device)
-
-                #     not_done_masks = torch.tensor(
-                #         [[0.0] if done else [1.0] for done in dones],
-                #         dtype=torch.float,
-                #         device=self.device,
-                #     )
-
-                #     action_list.append(self.get_action(actions.item(),act_to_idx))
-                #     # observation_list.append([prev_obs[0],observations[0]])
-
-                    # print(self.get_action(actions.item(),act_to_idx) )
-                    if self.get_action(actions.item(),act_to_idx) == "open":
-                        info = self.envs.act("take")
-                        print(info)
-                        info = self.envs.act("put")
-                        print(info)
-
-                        self.envs.act("up")
-
-                        info = self.envs.act("take")
-                        print(info)
-                        info = self.envs.act("put")
-                        print(info)
-
-                        self.envs.act("down")
-                        self.envs.act("down")
-
-                        info = self.envs.act("take")
-                        print(info)
-                        info = self.envs.act("put")
-                        print(info)
-
-                        self.envs.act("up")
-                        self.envs.act("tleft")
-
-                        info = self.envs.act("take")
-                        print(info)
-                        info = self.envs.act("put")
-                        print(info)
-
-                        self.envs.act("tright")
-                        self.envs.act("tright")
-                        self.envs.act("down")
-
-                        info = self.envs.act("take")
-                        print(info)
-                        info = self.envs.act("put")
-                        print(info)
-
-                        self.envs.act("up")
-                        self.envs.act("tleft")
-                        self.envs.act("close")
-                                                       
-
-                    outputs = self.envs.step([a[0].item() for a in actions])
-                    observations, rewards, dones, infos = [
-                        list(x) for x in zip(*outputs)
-                    ]
-                    
-                    batch = self.batch_obs(observations, self.device)
-
-                    not_done_masks = torch.tensor(
-                        [[0.0] if done else [1.0] for done in dones],
-                        dtype=torch.float,
-                        device=self.device,
-                    )
-
-                    # action_list.append(self.get_action(actions.item(),act_to_idx))
-                    # observation_list.append([prev_obs[0],observations[0]])
-
-
-
-
-
-            if dones[0]:
-
-                scene = current_episodes[0]['scene_id']
-                episode = current_episodes[0]['episode_id']
 
-                # Create filename
-                filename = f"{scene}_{episode}.pkl"
+            prev_actions.copy_(actions)
 
-                # Data to save
-                data_to_save = {'action_list': action_list, 'observation_list': observation_list}  # Replace with your actual data
+            # one batched D2H transfer instead of a per-env .item() sync
+            self.envs.async_step(actions.view(-1).tolist())
 
-                # Save data to pickle file
-                with open(filename, 'wb') as f:
-                    pickle.dump(data_to_save, f)
-
-                action_list = []
-                observation_list = [] 
-
-
-
-            rewards = torch.tensor(
-                rewards, dtype=torch.float, device=self.device
-            ).unsqueeze(1)
-
-            current_episode_reward += rewards
+            # while the workers render this step, finish the previous one
+            if pending is not None:
+                self._finalize_eval_step(
+                    state,
+                    pending,
+                    current_episode_reward,
+                    stats_episodes,
+                    stats_sums,
+                    rollout_prefix,
+                    save_metadata,
+                )
 
-            # # [!!] store epiode history
-            # for i in range(self.envs.num_envs):
-            #     episode_infos[i].append(infos[i])
+            outputs = self.envs.wait_step()
+            observations, rewards, dones, infos = split_step_outputs(outputs)
+            state['step_count'] += 1
+            batch = self.batch_obs(observations, self.device)
 
+            not_done_masks = self._eval_not_done_masks(dones)
+
+            state['actions'] = actions
+            state['observations'] = observations
+            state['rewards'] = rewards
+            state['dones'] = dones
+            state['infos'] = infos
+            step_hook(state)
+            # the hook may have re-stepped the envs
+            observations = state['observations']
+            rewards = state['rewards']
+            dones = state['dones']
+            infos = state['infos']
+            batch = state.pop('batch', batch)
+            not_done_masks = state.pop('not_done_masks', not_done_masks)
+
+            # deferred to the next iteration's render window (or the drain
+            # below once the loop exits)
+            pending = (current_episodes, observations, rewards, dones, infos)
 
-            next_episodes = self.envs.current_episodes()
             envs_to_pause = []
-            n_envs = self.envs.num_envs
-            prev_obs = observations
-            # for i in range(n_envs):
-
-            #     if (
-            #         next_episodes[i]['scene_id'],
-            #         next_episodes[i]['episode_id'],
-            #     ) in stats_episodes:
-            #         envs_to_pause.append(i)
-
-            #     # episode ended
-            #     if not_done_masks[i].item() == 0:
-            #         # pbar.update()
-            #         episode_stats = dict()
-            #         episode_stats["reward"] = current_episode_reward[i].item()
-            #         episode_stats.update(
-            #             self._extract_scalars_from_info(infos[i])
-            #         )
-            #         current_episode_reward[i] = 0
-
-
-            #         # [!!] Add per-step episode information
-            #         episode_info = []
-            #         for info in episode_infos[i]:
-            #             act_data = {'reward': info['reward'], 'action': info['action'], 'target': None, 'success': info['success']} 
-            #             if 'target' in info:
-            #                 act_data['target'] = info['target']['objectId']
-            #             episode_info.append(act_data)
-            #         episode_stats['step_info'] = episode_info
-            #         episode_infos[i] = []
-
-            #         # use scene_id + episode_id as unique id for storing stats
-            #         stats_episodes[
-            #             (
-            #                 current_episodes[i]['scene_id'],
-            #                 current_episodes[i]['episode_id'],
-            #             )
-            #         ] = episode_stats
-
-            #         # [!!] Save episode data in the eval folder for processing
-            #         scene, episode = current_episodes[i]['scene_id'], current_episodes[i]['episode_id']
-            #         torch.save({'scene_id':scene,
-            #                     'episode_id':episode,
-            #                     'stats':episode_stats},
-            #                     f'{self.config.CHECKPOINT_FOLDER}/eval/{scene}_{episode}.pth')
-                    
-            
+            if dones.any():
+                # finish the episode bookkeeping now (normally deferred to
+                # the overlap window) so the duplicate check below sees the
+                # episode that just completed
+                self._finalize_eval_step(
+                    state,
+                    pending,
+                    current_episode_reward,
+                    stats_episodes,
+                    stats_sums,
+                    rollout_prefix,
+                    save_metadata,
+                )
+                pending = None
 
+                # an env lands on an already-evaluated episode only after a
+                # reset, so ordinary steps skip this worker round-trip; one
+                # set lookup per env instead of per-key dict scans
+                next_episodes = self.envs.current_episodes()
+                next_keys = zip(
+                    (ep['scene_id'] for ep in next_episodes),
+                    (ep['episode_id'] for ep in next_episodes),
+                )
+                # env 0 is never paused: the rollout recording and the
+                # scripted probes are hard-wired to slot 0, and pausing it
+                # would slide another env's episode into that slot
+                envs_to_pause = [
+                    i for i, key in enumerate(next_keys)
+                    if i != 0 and key in stats_episodes
+                ]
 
             (
                 self.envs,
@@ -1683,16 +1062,291 @@ class PPOTrainer(BaseRLTrainer):
                 rgb_frames,
             )
 
+        # drain the pipeline: the final step's tail has not run yet
+        if pending is not None:
+            self._finalize_eval_step(
+                state,
+                pending,
+                current_episode_reward,
+                stats_episodes,
+                stats_sums,
+                rollout_prefix,
+                save_metadata,
+            )
+
         num_episodes = len(stats_episodes)
         aggregated_stats = dict()
         # for stat_key in next(iter(stats_episodes.values())).keys(): # [!!] Only output reward
         for stat_key in ['reward']:
-            aggregated_stats[stat_key] = (
-                sum([v[stat_key] for v in stats_episodes.values()])
-                / num_episodes
-            )
+            aggregated_stats[stat_key] = stats_sums[stat_key] / num_episodes
 
         for k, v in aggregated_stats.items():
             logger.info(f"Average episode {k}: {v:.4f}")
 
+        self._drain_rollout_dumps()
         self.envs.close()
+
+    def _finalize_eval_step(
+        self, state, pending, current_episode_reward, stats_episodes,
+        stats_sums, rollout_prefix, save_metadata,
+    ):
+        r"""Env-free tail of an eval step: dump the episode rollout if it
+        ended, accumulate rewards, record per-episode stats and hand the
+        RGB frame to the next hook. Deferred by _eval_rollout_loop so it
+        runs while the workers render the following step.
+        """
+        current_episodes, observations, rewards, dones, infos = pending
+
+        current_episode_reward.add_(self._eval_rewards_tensor(rewards))
+
+        # rollout recording stays on env 0, the only env the scripted-macro
+        # hooks probe; the remaining envs run pure policy steps and only
+        # contribute to the reward stats above
+        flush_every = self.config.EVAL.ROLLOUT_FLUSH_EVERY
+        if dones[0] or (
+            flush_every > 0
+            and len(state['observation_list']) >= flush_every
+        ):
+
+            scene = current_episodes[0]['scene_id']
+            episode = current_episodes[0]['episode_id']
+
+            # Create filename. Episodes that collect many frame pairs are
+            # flushed in _partN chunks so the resident arrays stay bounded
+            # instead of ballooning until the episode ends (THOR wants that
+            # RAM for rendering); short episodes keep the single-file form
+            if state['part_count'] == 0 and dones[0]:
+                filename = f"{rollout_prefix}{scene}_{episode}.pkl"
+            else:
+                filename = (
+                    f"{rollout_prefix}{scene}_{episode}"
+                    f"_part{state['part_count']}.pkl"
+                )
+
+            # Data to save
+            data_to_save = {
+                'action_list': state['action_list'],
+                'observation_list': state['observation_list'],
+            }
+            if save_metadata:
+                data_to_save["metadata_list"] = state['metadata_list']
+                if dones[0]:
+                    # episode-global step indices ride in the final chunk
+                    data_to_save["obj_cov_step"] = state['obj_cov_step']
+                    data_to_save["obj_pick_step"] = state['obj_pick_step']
+
+            # Serialize on the background writer; the frame arrays
+            # dominate and pickling them inline stalled the first
+            # step of the next episode
+            self._dump_rollout_async(filename, data_to_save)
+
+            state['action_list'] = []
+            state['observation_list'] = []
+            state['metadata_list'] = []
+            if dones[0]:
+                state['obj_cov_step'] = []
+                state['obj_pick_step'] = []
+                state['part_count'] = 0
+            else:
+                state['part_count'] += 1
+
+        # stats are vectorized over envs: only the (rare) finished episodes
+        # pay a sync, everything else stays batched on device
+        for i in np.flatnonzero(dones):
+            episode_stats = dict()
+            episode_stats["reward"] = current_episode_reward[i].item()
+            episode_stats.update(self._extract_scalars_from_info(infos[i]))
+            for k, v in episode_stats.items():
+                stats_sums[k] += v
+            current_episode_reward[i] = 0
+            stats_episodes[
+                (
+                    current_episodes[i]['scene_id'],
+                    current_episodes[i]['episode_id'],
+                )
+            ] = episode_stats
+
+        # keep only the RGB frame for the next step's rollout record;
+        # holding the full observation dict would pin the aux masks in
+        # memory for no reader
+        state['prev_rgb'] = observations[0]['rgb']
+
+    def _refresh_state_after_macro(self, state, seq_infos):
+        r"""Refresh the loop state from a scripted macro's final observation.
+        The policy action that triggered the hook already ran before the
+        macro, so re-stepping the envs with it (as this path used to do)
+        only executed the same action twice; the macro's own infos carry
+        the post-macro observation for env 0, and the step's rewards/dones
+        stand as they are.
+        """
+        for info in reversed(seq_infos):
+            next_obs = info.get("next_obs")
+            if next_obs is not None:
+                observations = list(state['observations'])
+                observations[0] = next_obs
+                state['observations'] = observations
+                state['batch'] = self.batch_obs(observations, self.device)
+                return
+
+    def _e2e_step_hook(self, state):
+        r"""E2E mode: record the frame pair around successful policy-chosen
+        open/take interactions.
+        """
+        actions = state['actions']
+        rewards = state['rewards']
+        dones = state['dones']
+        infos = state['infos']
+        observations = state['observations']
+
+        if not dones[0]:
+
+            if infos[0]["success"]: # more exploration observed
+                act_name = E2E_IDX_TO_ACT[actions[0].item()]
+                if rewards[0]== 1 and act_name=="open":
+                    logger.debug("badiya")
+                    state['obj_cov_step'].append(state['step_count'])
+
+                    state['action_list'].append("open")
+                    state['observation_list'].append([_rollout_frame(state['prev_rgb']), _rollout_frame(observations[0])])
+                    state['metadata_list'].append([infos[0]["prev_metadata"],infos[0]["next_metadata"]])
+
+                if (rewards[0]== 2 or rewards[0]== 5) and act_name=="take":
+                    logger.debug("bbhot badiya")
+                    state['obj_pick_step'].append(state['step_count'])
+
+                    state['action_list'].append("take")
+                    state['observation_list'].append([_rollout_frame(state['prev_rgb']), _rollout_frame(observations[0])])
+                    state['metadata_list'].append([infos[0]["prev_metadata"],infos[0]["next_metadata"]])
+
+    def _hybrid_step_hook(self, state):
+        r"""HYBRID mode: scripted take/put/close probe after a successful
+        interaction, plus the packed-history stuck recovery.
+        """
+        actions = state['actions']
+        rewards = state['rewards']
+        dones = state['dones']
+        infos = state['infos']
+        observations = state['observations']
+        act_to_idx = ACT_TO_IDX
+
+        # encode (action, success) into one byte and shift it into the
+        # history int; five identical steps is one SWAR compare
+        act_code = (
+            act_to_idx.get(infos[0]["action"], len(act_to_idx)) * 2
+            + int(bool(infos[0]["success"]))
+        )
+        act_hist = ((state.get('act_hist', 0) << 8) | act_code) & 0xFFFFFFFFFF
+        state['act_hist'] = act_hist
+        state['act_hist_len'] = min(state.get('act_hist_len', 0) + 1, 5)
+        if state['act_hist_len'] == 5 and act_hist == (act_hist & 0xFF) * 0x0101010101:
+            logger.debug("horiya")
+            times = random.randint(1, 3)  # Randomly choose to call 1, 2, or 3 times
+            # one worker round-trip for the whole scripted recovery
+            self.envs.act_sequence_at(0, ["tright"] * times + ["forward"] * 4)
+
+        if not dones[0]:
+
+            if infos[0]["success"]:
+                if IDX_TO_ACT[actions[0].item()] == "open":
+                    if rewards[0]== 1:
+                        logger.debug("badiya")
+                        state['obj_cov_step'].append(state['step_count'])
+                        state['action_list'].append("open")
+                        state['observation_list'].append([_rollout_frame(state['prev_rgb']), _rollout_frame(observations[0])])
+                        state['metadata_list'].append([infos[0]["prev_metadata"],infos[0]["next_metadata"]])
+
+                # take/put/close is scripted, so dispatch it as one
+                # batched worker call instead of three round-trips
+                seq_infos = self.envs.act_sequence_at(0, HYBRID_PROBE_SEQ)
+                info = seq_infos[0]
+                if info["success"]:
+                    logger.debug("bhot badiya")
+                    state['obj_pick_step'].append(state['step_count'])
+                    state['action_list'].append("take")
+                    state['observation_list'].append([_rollout_frame(info["prev_obs"]["rgb"]), _rollout_frame(info["next_obs"]["rgb"])])
+                    state['metadata_list'].append([info["prev_metadata"],info["next_metadata"]])
+
+    def _obcov_step_hook(self, state):
+        r"""OBCOV mode: scripted open/take/put/close probe after an object
+        coverage reward.
+        """
+        rewards = state['rewards']
+        dones = state['dones']
+
+        if not dones[0]:
+            if rewards[0]== 1:
+                logger.debug("hmm %s", state['step_count'])
+                state['obj_cov_step'].append(state['step_count'])
+                # the probe is scripted, so run it worker-side as one
+                # command round-trip instead of four
+                seq_infos = self.envs.act_sequence_at(0, OBCOV_PROBE_SEQ)
+
+                info = seq_infos[0]
+                if info["success"]:
+                    state['action_list'].append("open")
+                    state['observation_list'].append([_rollout_frame(info["prev_obs"]["rgb"]), _rollout_frame(info["next_obs"]["rgb"])])
+                    state['metadata_list'].append([info["prev_metadata"],info["next_metadata"]])
+
+                info = seq_infos[1]
+                if info["success"]:
+                    logger.debug("wall done")
+                    state['obj_pick_step'].append(state['step_count'])
+                    state['action_list'].append("take")
+                    state['observation_list'].append([_rollout_frame(info["prev_obs"]["rgb"]), _rollout_frame(info["next_obs"]["rgb"])])
+                    state['metadata_list'].append([info["prev_metadata"],info["next_metadata"]])
+
+                self._refresh_state_after_macro(state, seq_infos)
+
+    def _no_action_step_hook(self, state):
+        r"""no_action mode: scripted take/put probing sweep around
+        policy-chosen opens.
+        """
+        actions = state['actions']
+        rewards = state['rewards']
+        dones = state['dones']
+
+        if not dones[0]:
+            # rewards arrive as Python floats, so this never touches the
+            # device; the tolerance guards the scripted branch against the
+            # reward coming out of float arithmetic rather than a literal
+            if abs(rewards[0] - 0.9) < 1e-5:
+                act_name = IDX_TO_ACT[actions[0].item()]
+                if act_name in _OPEN_CLOSE:
+                    state['action_list'].append(act_name)
+
+                if act_name == "open":
+                    # the whole probing sweep runs worker-side: one command
+                    # round-trip instead of ~20 pickle+pipe exchanges
+                    seq_infos = self.envs.act_sequence_at(
+                        0, NO_ACTION_PROBE_SEQ
+                    )
+                    # the take/put results are the interesting ones; emit
+                    # them as one record instead of ten
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "scripted open probe: %s",
+                            [seq_infos[idx] for idx in _NO_ACTION_TAKE_PUT_IDX],
+                        )
+
+                    self._refresh_state_after_macro(state, seq_infos)
+
+    def eval(self) -> None:
+
+        if E2E:
+            self._eval_rollout_loop(self._e2e_step_hook, "E2E_rollouts/")
+
+        if HYBRID:
+            self._eval_rollout_loop(self._hybrid_step_hook, "Hybrid_rollouts/")
+
+        if OBCOV:
+            self._eval_rollout_loop(self._obcov_step_hook, "")
+
+    def no_action(self) -> None:
+        r"""Main method of trainer evaluation. Calls _eval_checkpoint() that
+        is specified in Trainer class that inherits from BaseRLTrainer
+        Returns:
+            None
+        """
+        self._eval_rollout_loop(
+            self._no_action_step_hook, "", save_metadata=False
+        )
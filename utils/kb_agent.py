@@ -13,6 +13,7 @@ import torchvision.transforms as transforms
 import torch.nn.functional as F
 
 from rl.common.env_utils import construct_envs, get_env_class
+from rl.common.utils import split_step_outputs
 from rl.config import get_config
 from interaction_exploration.utils import util
 
@@ -158,7 +159,10 @@ class KBController(object):
 
             # handle environment actions
             outputs = self.envs.step([act_idx])
-            self.observation, reward, done, info = [list(x)[0] for x in zip(*outputs)]
+            observations, rewards, dones, infos = split_step_outputs(outputs)
+            self.observation, reward, done, info = (
+                observations[0], rewards[0], dones[0], infos[0]
+            )
             print (f"A: {info['action']} | S: {info['success']} | R: {info['reward']}")
 
 
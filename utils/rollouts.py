@@ -0,0 +1,34 @@
+import glob
+import os
+import pickle
+
+
+def load_rollout(file_path):
+    # long episodes are flushed by the trainer as _partN.pkl chunks when
+    # EVAL.ROLLOUT_FLUSH_EVERY is set; reassemble them, otherwise fall
+    # back to the single-file rollout
+    if os.path.exists(file_path):
+        with open(file_path, 'rb') as f:
+            return pickle.load(f)
+
+    stem, ext = os.path.splitext(file_path)
+    part_paths = sorted(
+        glob.glob(f"{stem}_part*{ext}"),
+        key=lambda p: int(p[len(stem) + len('_part'):-len(ext)]),
+    )
+    if not part_paths:
+        raise FileNotFoundError(file_path)
+
+    data = None
+    for part_path in part_paths:
+        with open(part_path, 'rb') as f:
+            chunk = pickle.load(f)
+        if data is None:
+            data = chunk
+        else:
+            for key, value in chunk.items():
+                if key in data:
+                    data[key].extend(value)
+                else:
+                    data[key] = value
+    return data
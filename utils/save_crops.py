@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
 import os
-import pickle
+
+from rollouts import load_rollout
 
 
 # Load all images from a folder
@@ -26,8 +27,7 @@ actor_grid = np.array([center[0], center[0], center[1], center[1]])
 
 file_path = 'FloorPlan4_9264049.pkl'
 
-with open(file_path, 'rb') as f:
-    data = pickle.load(f)
+data = load_rollout(file_path)
 
 actions = data['action_list']
 print(actions)